@@ -0,0 +1,105 @@
+"""
+_auth.py – shared JWT signing for the m-Path scripts
+Author: Kyunghun Lee (kyunghun.lee@nih.gov)
+
+MIT License
+Copyright (c) 2025 Kyunghun Lee
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Every script gets its m-Path tokens from make_jwt(), so key loading, token
+reuse and the JWT algorithm behave the same everywhere:
+
+* a parsed key is cached per (path, mtime), so a rewritten (rotated) key file
+  is picked up on the next call without restarting the process;
+* a token is cached per (user code, key path, key mtime, TTL) and reused while
+  more than REFRESH_MARGIN_S seconds of it remain;
+* the algorithm follows the key type: ES256 for the P-256 keys written by
+  ``generate_keys.py --algorithm ec``, RS256 for RSA keys.
+"""
+
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+__all__ = ["REFRESH_MARGIN_S", "algorithm_for", "load_key", "make_jwt", "sign"]
+
+REFRESH_MARGIN_S = 30
+
+_EC_ALGORITHMS = {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}
+
+
+def algorithm_for(private_key) -> str:
+    """Return the JWT algorithm for ``private_key`` (ES256/384/512 for EC keys, else RS256)."""
+    if isinstance(private_key, ec.EllipticCurvePrivateKey):
+        try:
+            return _EC_ALGORITHMS[private_key.curve.name]
+        except KeyError:
+            raise ValueError(f"Unsupported EC curve for JWT signing: {private_key.curve.name}") from None
+    return "RS256"
+
+
+def sign(claims: dict, private_key) -> str:
+    """Encode ``claims`` as a JWT signed with ``private_key``."""
+    return jwt.encode(claims, private_key, algorithm=algorithm_for(private_key))
+
+
+@lru_cache(maxsize=8)
+def _load_key(path: Path, mtime_ns: int):
+    # mtime_ns is only part of the cache key; the local key file is trusted,
+    # so the slow RSA consistency check is skipped
+    return serialization.load_pem_private_key(
+        path.read_bytes(), password=None, unsafe_skip_rsa_key_validation=True
+    )
+
+
+def _key_mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Private key not found: {path}") from None
+
+
+def load_key(private_key_path):
+    """Return the parsed PEM private key, re-read only when the file changes."""
+    path = Path(private_key_path)
+    return _load_key(path, _key_mtime_ns(path))
+
+
+# (user_code, key path, key mtime, ttl minutes) → (token, exp epoch seconds)
+_TOKEN_CACHE: dict[tuple[str, Path, int, int], tuple[str, int]] = {}
+
+
+def make_jwt(user_code: str, private_key_path, ttl_minutes: int = 5) -> str:
+    """Return a JWT for ``user_code`` valid for ``ttl_minutes``, reusing a cached one if fresh."""
+    path = Path(private_key_path)
+    mtime_ns = _key_mtime_ns(path)
+    cache_key = (user_code, path, mtime_ns, ttl_minutes)
+    cached = _TOKEN_CACHE.get(cache_key)
+    if cached and cached[1] - time.time() > REFRESH_MARGIN_S:
+        return cached[0]
+
+    exp_ts = int(time.time()) + ttl_minutes * 60
+    token = sign({"exp": exp_ts, "userCode": user_code}, _load_key(path, mtime_ns))
+    _TOKEN_CACHE[cache_key] = (token, exp_ts)
+    return token
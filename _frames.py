@@ -0,0 +1,97 @@
+"""
+_frames.py – shared DataFrame → CSV helpers for the m-Path download scripts
+Author: Kyunghun Lee (kyunghun.lee@nih.gov)
+
+MIT License
+Copyright (c) 2025 Kyunghun Lee
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+get_data, get_interactions and get_schedule localize epoch-ms timestamp
+columns and write their CSVs through these helpers, so all three produce the
+same text as ``df.to_csv(fp, index=False)`` whichever backend does the write.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+    # unquoted like pandas' QUOTE_MINIMAL; a cell or header that would need
+    # quotes makes the write fail, and the frame then goes through pandas
+    _ARROW_OPTS = pacsv.WriteOptions(quoting_style="none", quoting_header="none", eol=os.linesep)
+except (ImportError, TypeError):  # optional CSV backend; a pyarrow without quoting_header counts as absent
+    pa = None
+
+__all__ = ["localize_ms", "to_csv"]
+
+
+def localize_ms(df: pd.DataFrame, cols: list[str], tz: str) -> None:
+    """
+    Replace epoch-ms columns of ``df`` in place with local 'YYYY-MM-DD HH:MM:SS' text.
+
+    All columns go through one 1-D conversion (raveled column-major) and are
+    formatted by numpy rather than per-cell strftime; missing values stay NaN.
+    """
+    if not cols:
+        return
+    arr = df[cols].to_numpy(dtype="float64", na_value=np.nan).ravel(order="F")
+    local = pd.to_datetime(arr, unit="ms", utc=True, errors="coerce").tz_convert(tz).tz_localize(None)
+    iso = np.datetime_as_string(local.to_numpy(dtype="datetime64[s]"), unit="s")
+    txt = np.char.replace(iso, "T", " ").astype(object)
+    txt[local.isna()] = np.nan
+    df[cols] = pd.DataFrame(txt.reshape(len(df), len(cols), order="F"),
+                            index=df.index, columns=cols)
+
+
+def _arrow_to_csv(df: pd.DataFrame, fp: Path) -> bool:
+    """
+    Write ``df`` with pyarrow's C++ CSV writer when the output matches pandas.
+
+    Only frames of two or more columns that map to Arrow strings, integers or
+    nulls qualify, and no header or cell may need quoting. Floats and booleans
+    are formatted differently by Arrow ("1" vs "1.0", "true" vs "True"), and a
+    lone empty cell is written as "" by pandas, so those return False.
+    """
+    if pa is None or df.shape[1] < 2:
+        return False
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowException, ValueError, TypeError):
+        return False
+    if not all(pa.types.is_string(t) or pa.types.is_large_string(t)
+               or pa.types.is_integer(t) or pa.types.is_null(t)
+               for t in table.schema.types):
+        return False
+    try:
+        pacsv.write_csv(table, str(fp), _ARROW_OPTS)
+    except pa.ArrowInvalid:  # a value needs quoting; pandas rewrites the file
+        return False
+    return True
+
+
+def to_csv(df: pd.DataFrame, fp: Path) -> None:
+    """Write ``df`` to ``fp`` exactly as ``df.to_csv(fp, index=False)`` would."""
+    if not _arrow_to_csv(df, fp):
+        with open(fp, "wb", buffering=1024 * 1024) as f:
+            df.to_csv(f, index=False)
@@ -0,0 +1,80 @@
+"""
+_http.py – shared HTTP session for the m-Path scripts
+Author: Kyunghun Lee (kyunghun.lee@nih.gov)
+
+MIT License
+Copyright (c) 2025 Kyunghun Lee
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+Modules that import SESSION share one connection pool, so a process that
+calls several m-Path endpoints (e.g. get_clients then set_interactions)
+keeps one keep-alive TLS connection per host instead of one per module.
+Transport failures and 429/5xx answers are retried inside urllib3; the JSON
+``status`` field (e.g. -1 while data is being prepared) is left to the callers.
+"""
+
+import random
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import _jsonlib
+
+__all__ = ["RETRY", "SESSION", "STATUS_BACKOFF_BASE_S", "STATUS_BACKOFF_CAP_S",
+           "get_session", "parse_json", "status_backoff"]
+
+# Transport failures and 429/5xx answers are retried inside urllib3 (honouring
+# Retry-After). All m-Path writes replace state wholesale, so re-POSTing is safe.
+# raise_on_status=False hands the last response back for raise_for_status().
+RETRY = Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504),
+              allowed_methods=frozenset({"GET", "POST"}), respect_retry_after_header=True,
+              raise_on_status=False)
+
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=RETRY))
+SESSION.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
+
+# Wait between polls while the API answers status -1 (server still preparing data)
+STATUS_BACKOFF_BASE_S = 5.0
+STATUS_BACKOFF_CAP_S = 60.0
+
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (e.g. to mount custom adapters)."""
+    return SESSION
+
+
+def parse_json(resp: requests.Response):
+    """Decode an m-Path JSON response body with the fastest installed codec."""
+    resp.encoding = "utf-8"  # m-Path always answers UTF-8; skip charset sniffing if .text is read
+    return _jsonlib.loads(resp.content)
+
+
+def status_backoff(attempt: int, base: float = STATUS_BACKOFF_BASE_S,
+                   cap: float = STATUS_BACKOFF_CAP_S) -> float:
+    """Seconds to wait after the ``attempt``-th status -1 reply.
+
+    Exponential (base·2^(attempt-1), capped) with equal jitter: the wait is
+    never below half that value, so the server gets about as long to prepare
+    the data as with a fixed ``base`` wait, while concurrent clients spread out.
+    """
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return random.uniform(delay / 2, delay)
@@ -0,0 +1,91 @@
+"""
+_jsonlib.py – fastest available JSON codec for the m-Path scripts
+Author: Kyunghun Lee (kyunghun.lee@nih.gov)
+
+MIT License
+Copyright (c) 2025 Kyunghun Lee
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+The codec is picked once at import: orjson > msgspec > ujson > stdlib json,
+so callers pay no per-call dispatch. Every backend emits compact UTF-8 with
+non-ASCII characters kept as is, and ``loads`` raises ValueError on bad input.
+"""
+
+__all__ = ["BACKEND", "dumps_bytes", "dumps_indent", "loads"]
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    dumps_bytes = orjson.dumps
+    loads = orjson.loads
+
+    def dumps_indent(obj) -> str:
+        """Serialise ``obj`` to 2-space indented JSON text."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+
+except ImportError:  # optional speed-ups; the stdlib json module is used otherwise
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        dumps_bytes = msgspec.json.encode
+        _decode = msgspec.json.decode
+
+        def loads(data):
+            """Parse JSON bytes or text (msgspec's DecodeError re-raised as ValueError)."""
+            try:
+                return _decode(data)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from None
+
+        def dumps_indent(obj) -> str:
+            """Serialise ``obj`` to 2-space indented JSON text."""
+            return msgspec.json.format(msgspec.json.encode(obj), indent=2).decode("utf-8")
+
+    except ImportError:
+        try:
+            import ujson
+
+            BACKEND = "ujson"
+            loads = ujson.loads
+
+            def dumps_bytes(obj) -> bytes:
+                """Serialise ``obj`` to compact UTF-8 JSON bytes."""
+                return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+
+            def dumps_indent(obj) -> str:
+                """Serialise ``obj`` to 2-space indented JSON text."""
+                return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, indent=2)
+
+        except ImportError:
+            import json
+
+            BACKEND = "json"
+            loads = json.loads
+            _encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+            def dumps_bytes(obj) -> bytes:
+                """Serialise ``obj`` to compact UTF-8 JSON bytes."""
+                return _encode(obj).encode("utf-8")
+
+            def dumps_indent(obj) -> str:
+                """Serialise ``obj`` to 2-space indented JSON text."""
+                return json.dumps(obj, ensure_ascii=False, indent=2)
@@ -36,29 +36,49 @@ Interactive script to configure m-Path credentials.
 
 from __future__ import annotations
 from pathlib import Path
-from datetime import datetime, timezone, timedelta
-import os, subprocess, sys, json, jwt, stat
+import argparse, os, sys, stat
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
 
 # ───────────────────────────────────────────── 0 | CONSTANTS
 BASE_URL = "https://m-path.io/API2"
-PRIVATE_KEY_PEM = Path.home() / ".mpath_private_key.pem"
-PUBLIC_KEY_PEM  = Path.home() / ".mpath_public_key.pem"
+_HOME = Path.home()  # resolved once; the home directory does not change mid-run
+PRIVATE_KEY_PEM = _HOME / ".mpath_private_key.pem"
+PUBLIC_KEY_PEM  = _HOME / ".mpath_public_key.pem"
 
 # ───────────────────────────────────────────── 1 | SHELL RC HELPERS
 def detect_rc_file() -> Path:
     """Return the user's shell startup file (e.g., .zshrc or .bashrc)."""
     shell = os.environ.get("SHELL", "")
     if "zsh" in shell:
-        return Path.home() / ".zshrc"
+        return _HOME / ".zshrc"
     if "bash" in shell:
-        return Path.home() / (".bash_profile" if sys.platform == "darwin" else ".bashrc")
-    return Path.home() / ".profile"
+        return _HOME / (".bash_profile" if sys.platform == "darwin" else ".bashrc")
+    return _HOME / ".profile"
 
-def read_rc(rc_path: Path) -> list[str]:
-    """Read the lines from the RC file if it exists."""
-    if rc_path.exists():
-        return rc_path.read_text(errors="ignore").splitlines()
-    return []
+_EXPORT_PREFIX = b"export MPATH_USERCODE="
+
+def _find_usercode_line(rc_path: Path) -> tuple[int | None, str | None, list[str]]:
+    """
+    Read the RC file in one pass and locate the first ``export MPATH_USERCODE=`` line.
+
+    The file is read once in binary mode and split on ``\n`` only, so the
+    returned index always refers to the returned lines. Returns
+    ``(line index, value, lines)``; index and value are None when no export
+    line exists.
+    """
+    if not rc_path.exists():
+        return None, None, []
+    raw = rc_path.read_bytes().split(b"\n")
+    if raw and not raw[-1]:
+        raw.pop()
+    hit, value = None, None
+    for i, ln in enumerate(raw):
+        if ln.lstrip().startswith(_EXPORT_PREFIX):
+            hit = i
+            value = ln.split(b"=", 1)[1].decode(errors="ignore").strip('"\' \t\r\n')
+            break
+    return hit, value, [ln.decode(errors="ignore").removesuffix("\r") for ln in raw]
 
 def write_rc(rc_path: Path, lines: list[str]) -> None:
     """Write updated lines to the RC file and set secure permissions."""
@@ -74,18 +94,9 @@ def set_user_code() -> str:
     """
     env_code = os.getenv("MPATH_USERCODE")
     rc_path = detect_rc_file()
-    rc_lines = read_rc(rc_path)
 
     # Check if already defined in RC file
-    existing_line_idx = next(
-        (i for i, ln in enumerate(rc_lines)
-         if ln.strip().startswith("export MPATH_USERCODE=")),
-        None,
-    )
-
-    file_code = None
-    if existing_line_idx is not None:
-        file_code = rc_lines[existing_line_idx].split("=", 1)[1].strip('"\' \t')
+    existing_line_idx, file_code, rc_lines = _find_usercode_line(rc_path)
 
     current_code = env_code or file_code
     if current_code:
@@ -115,25 +126,53 @@ def set_user_code() -> str:
     return code
 
 # ───────────────────────────────────────────── 3 | KEY GENERATION
-def generate_keys() -> None:
+def generate_keys(algorithm: str = "rsa") -> None:
     """
-    Generate RSA private and public keys if they do not exist.
+    Generate private and public keys if they do not exist.
+
+    Keys are generated in-process with ``cryptography``; the private key file
+    is created with 0600 permissions from the start.
+
+    Args:
+        algorithm: "rsa" (RSA-2048, used with RS256) or "ec" (P-256, used with
+            ES256; much faster to generate and sign, but the m-Path server must
+            accept ES256 tokens).
     """
     if PRIVATE_KEY_PEM.exists():
         print(f"Private key already present → {PRIVATE_KEY_PEM}")
         return
 
-    print("Generating 2048-bit RSA key pair …")
-    subprocess.run(
-        ["openssl", "genpkey", "-algorithm", "RSA", "-out", str(PRIVATE_KEY_PEM),
-         "-pkeyopt", "rsa_keygen_bits:2048"], check=True)
-    subprocess.run(
-        ["openssl", "rsa", "-in", str(PRIVATE_KEY_PEM),
-         "-pubout", "-out", str(PUBLIC_KEY_PEM)], check=True)
+    if algorithm == "ec":
+        print("Generating EC P-256 key pair …")
+        key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == "rsa":
+        print("Generating 2048-bit RSA key pair …")
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise ValueError(f"Unknown key algorithm: {algorithm!r} (expected 'rsa' or 'ec')")
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+
+    fd = os.open(PRIVATE_KEY_PEM, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(private_pem)
+    PUBLIC_KEY_PEM.write_bytes(public_pem)
     print(f"Keys written:\n  {PRIVATE_KEY_PEM}\n  {PUBLIC_KEY_PEM}")
 
 # ───────────────────────────────────────────── 4 | MAIN
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set up m-Path credentials.")
+    parser.add_argument("--algorithm", choices=("rsa", "ec"), default="rsa",
+                        help="Key type to generate (default: rsa; ec requires ES256 support on the server).")
+    args = parser.parse_args()
+
     print("────────────────────────────────────────────")
     print(" m-Path key setup and user code registration")
     print("────────────────────────────────────────────")
@@ -141,6 +180,6 @@ if __name__ == "__main__":
     user_code = set_user_code()
     print(f"Using MPATH_USERCODE = {user_code}")
 
-    generate_keys()
+    generate_keys(args.algorithm)
 
     print("Setup complete.")
@@ -29,21 +29,33 @@ SOFTWARE.
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
+import re
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, replace
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-import jwt
 import requests
 
+import _auth, _http
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
+
 __all__ = [
     "MPathConfig",
+    "close_session",
     "get_clients",
+    "get_clients_batch",
     "make_jwt",
     "normalize_changed_after",
     "resolve_user_code",
@@ -51,7 +63,13 @@ __all__ = [
 
 # ─────────────────────────────────────────────── 0 | CONFIG
 
-@dataclass(frozen=True)
+_HOME = Path.home()  # resolved once at import
+
+# ``slots=True`` needs Python 3.10+; on 3.9 this stays a plain frozen dataclass.
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class MPathConfig:
     """Container for paths and base URL.
 
@@ -59,8 +77,8 @@ class MPathConfig:
     to override defaults when running from Jupyter or other scripts.
     """
 
-    private_key_pem: Path = Path.home() / ".mpath_private_key.pem"
-    public_key_pem: Path = Path.home() / ".mpath_public_key.pem"  # kept for parity/debugging
+    private_key_pem: Path = _HOME / ".mpath_private_key.pem"
+    public_key_pem: Path = _HOME / ".mpath_public_key.pem"  # kept for parity/debugging
     base_dump_dir: Path = Path("mpath_clients").expanduser()
     base_url: str = "https://dashboard.m-path.io/API2"  # alt: "https://m-path.io/API2"
 
@@ -69,6 +87,13 @@ class MPathConfig:
 GLOBAL_CONFIG = MPathConfig()
 DEFAULT_CHANGED_AFTER_UTC = "2024-01-01 00:00:00"
 
+# Signed tokens are reused until this many seconds before they expire (see _auth.py)
+JWT_REFRESH_MARGIN_S = _auth.REFRESH_MARGIN_S
+
+# Retry backoff while the API answers status -1 (server still preparing data)
+STATUS_BACKOFF_BASE_S = _http.STATUS_BACKOFF_BASE_S
+BACKOFF_CAP_S = _http.STATUS_BACKOFF_CAP_S
+
 
 # ─────────────────────────────────────────────── 1 | JWT
 
@@ -80,17 +105,22 @@ def make_jwt(user_code: str, ttl_minutes: int = 5, *, config: MPathConfig = GLOB
         ttl_minutes: Token lifetime in minutes.
         config: ``MPathConfig`` specifying the private key path.
 
+    The signing algorithm follows the key type: ES256 for EC keys, RS256 otherwise.
+
     Returns:
-        Encoded JWT string.
+        Encoded JWT string. A previously signed token for the same user code,
+        key and TTL is returned while it still has more than
+        ``JWT_REFRESH_MARGIN_S`` seconds to live.
     """
-    private_key = config.private_key_pem.read_text()
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)
-    payload = {"exp": int(exp.timestamp()), "userCode": user_code}
-    return jwt.encode(payload, private_key, algorithm="RS256")
+    return _auth.make_jwt(user_code, config.private_key_pem, ttl_minutes)
 
 
 # ─────────────────────────────────────────────── 2 | HELPERS
 
+_DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+_DATETIME_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}")
+
+
 def normalize_changed_after(dt_str: Optional[str]) -> Optional[str]:
     """Normalize a user-supplied datetime string to 'YYYY-MM-DD HH:MM:SS' (UTC).
 
@@ -103,6 +133,20 @@ def normalize_changed_after(dt_str: Optional[str]) -> Optional[str]:
     if not dt_str:
         return DEFAULT_CHANGED_AFTER_UTC
 
+    # Fast path for the canonical zero-padded forms. The regex pins the exact
+    # shape (fromisoformat accepts many more on 3.11+); fromisoformat then
+    # rejects out-of-range values such as month 13.
+    m = (_DATE_RE if len(dt_str) == 10 else _DATETIME_RE).fullmatch(dt_str)
+    if m:
+        try:
+            datetime.fromisoformat(dt_str)
+        except ValueError:
+            pass  # fall through so the error below is raised
+        else:
+            return dt_str if m.re is _DATETIME_RE else f"{dt_str} 00:00:00"
+
+    # Slow path: strptime also takes non-padded input such as '2024-5-1'
+
     # Try date-only format
     try:
         d = datetime.strptime(dt_str, "%Y-%m-%d")
@@ -121,20 +165,35 @@ def normalize_changed_after(dt_str: Optional[str]) -> Optional[str]:
         )
 
 
+_JWT_RE = re.compile(r"([?&]JWT=)[^&]*")
+
+
 def _sanitize_url(url: str) -> str:
-    """Redact JWT token when printing URLs for logging/debugging."""
-    if "JWT=" in url:
-        head, tail = url.split("JWT=", 1)
-        rest = tail.split("&", 1)
-        if len(rest) == 2:
-            _token, rest_params = rest
-            return f"{head}JWT=<redacted>&{rest_params}"
-        return f"{head}JWT=<redacted>"
-    return url
+    """Redact JWT token(s) when printing URLs for logging/debugging."""
+    return _JWT_RE.sub(r"\1<redacted>", url)
+
+
+def _json_bytes(obj, pretty: bool = False) -> bytes:
+    """Serialize ``obj`` to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
 
 # ─────────────────────────────────────────────── 3 | API CORE
 
+# The JSON-level status -1 is handled by _fetch_clients_with_retry.
+_SESSION = _http.SESSION
+
+
+def close_session() -> None:
+    """Release the shared session's pooled connections (they reopen on the next request)."""
+    _SESSION.close()
+
+
 def _call_raw(endpoint: str, *, show_url: bool = False, config: MPathConfig = GLOBAL_CONFIG, **params) -> Dict:
     """Perform GET request to the specified m-Path API endpoint.
 
@@ -147,25 +206,35 @@ def _call_raw(endpoint: str, *, show_url: bool = False, config: MPathConfig = GL
     Returns:
         Parsed JSON response as dict.
     """
-    req = requests.Request("GET", f"{config.base_url}/{endpoint}", params=params)
-    prepped = req.prepare()
+    url = f"{config.base_url}/{endpoint}"
     if show_url:
-        print(f"→ GET {_sanitize_url(prepped.url)}")
+        preview = requests.models.PreparedRequest()
+        preview.prepare_url(url, params)
+        print(f"→ GET {_sanitize_url(preview.url)}")
 
-    with requests.Session() as s:
-        resp = s.send(prepped, timeout=30)
+    resp = _SESSION.get(url, params=params, timeout=30)
     resp.raise_for_status()
-    return resp.json()
+    return _http.parse_json(resp)
 
 
-def _stamp_and_dump(body: Dict, primary_key: str, out_dir: Path, suffix: str) -> List[Dict]:
+def _stamp_and_dump(body: Dict, primary_key: str, out_dir: Path, suffix: str,
+                    pretty: bool = False, skip_unchanged: bool = False) -> List[Dict]:
     """Append download timestamp, then save raw JSON payload to disk.
 
+    New files are written to a temporary name and moved into place, so a
+    partial dump is never left behind. With ``skip_unchanged`` a hidden sidecar
+    per ``primary_key``/``suffix`` records a blake2b digest of the written bytes
+    (this run's timestamp blanked out) and the file name; when the server
+    returns the same payload again and that file still exists, the write is
+    skipped.
+
     Args:
         body: Entire API response body.
         primary_key: Top-level key in the response that holds the data list ("clients" here).
         out_dir: Output directory.
         suffix: String to include in the filename (e.g. a timestamp or changedAfter value).
+        pretty: Indent the JSON file (larger and slower to write); compact by default.
+        skip_unchanged: Skip the write when the previous dump is identical and present.
 
     Returns:
         The list of rows extracted from the body.
@@ -176,16 +245,71 @@ def _stamp_and_dump(body: Dict, primary_key: str, out_dir: Path, suffix: str) ->
     rows = body.get(primary_key, body.get("data", []))
     for r in rows:
         r["downloadedAt"] = iso_now
+    payload = _json_bytes(body, pretty=pretty)
+
+    sidecar = out_dir / f".last_{primary_key}_{suffix}.hash"
+    if skip_unchanged:
+        # the downloadedAt stamps are the only bytes that differ between runs
+        digest = hashlib.blake2b(payload.replace(iso_now.encode("ascii"), b""), digest_size=16).hexdigest()
+        last_digest, _, last_name = (sidecar.read_text() if sidecar.is_file() else "").partition(" ")
+        if last_name and last_digest == digest and (out_dir / last_name).is_file():
+            print(f"✓ Payload unchanged since {out_dir / last_name}; nothing written")
+            return rows
 
     out_dir.mkdir(parents=True, exist_ok=True)
     out_json = out_dir / f"{primary_key}_{suffix}_{iso_now}.json"
-    out_json.write_text(json.dumps(body, indent=2, ensure_ascii=False))
+    tmp = out_json.with_suffix(".tmp")
+    with open(tmp, "wb", buffering=1 << 20) as f:
+        f.write(payload)
+    os.replace(tmp, out_json)
+    if skip_unchanged:
+        sidecar.write_text(f"{digest} {out_json.name}")
     print(f"✓ Raw payload saved → {out_json}")
     return rows
 
 
 # ─────────────────────────────────────────────── 4 | HIGH-LEVEL FETCH
 
+def _fetch_clients_with_retry(
+    user_code: str,
+    changed_after_utc: Optional[str],
+    max_retries: int,
+    show_url: bool,
+    config: MPathConfig,
+) -> Dict:
+    """Call getClients until it answers status 1 and return the raw body.
+
+    Args:
+        user_code: 5-character m-Path user code.
+        changed_after_utc: Normalized changedAfterUTC value, or None to omit it.
+        max_retries: Max # of attempts while the API returns status -1.
+        show_url: Print expanded URL (JWT redacted) before sending.
+        config: ``MPathConfig`` providing key path and base URL.
+    """
+    for attempt in range(1, max_retries + 1):
+        token = make_jwt(user_code=user_code, config=config)
+        params = {"userCode": user_code, "JWT": token}
+        if changed_after_utc:
+            params["changedAfterUTC"] = changed_after_utc
+
+        body = _call_raw("getClients", show_url=show_url, config=config, **params)
+        status = body.get("status")
+
+        if status == 1:
+            return body
+
+        if status == -1:
+            if attempt < max_retries:
+                delay = _http.status_backoff(attempt, STATUS_BACKOFF_BASE_S, BACKOFF_CAP_S)
+                print(f"API returned status –1 (attempt {attempt}/{max_retries}); retrying in {delay:.1f} seconds.")
+                time.sleep(delay)
+                continue
+            raise RuntimeError("API gave status –1 after max retries.")
+
+        raise RuntimeError(f"Unexpected API status: {status}\n{json.dumps(body, indent=2)}")
+    raise ValueError("max_retries must be at least 1.")
+
+
 def get_clients(
     user_code: str,
     changed_after_utc: Optional[str] = None,
@@ -193,6 +317,8 @@ def get_clients(
     show_url: bool = False,
     include_changed_after: bool = True,
     *,
+    pretty: bool = False,
+    skip_unchanged: bool = False,
     config: MPathConfig = GLOBAL_CONFIG,
 ) -> Tuple[List[Dict], Path]:
     """Fetch client metadata from m-Path and dump raw JSON only.
@@ -203,6 +329,10 @@ def get_clients(
         max_retries: Max # of retries when API returns status -1.
         show_url: Print expanded URL (JWT redacted) before sending.
         include_changed_after: If False, omit the changedAfterUTC parameter entirely (fetch all).
+        pretty: Write the raw JSON indented instead of compact.
+        skip_unchanged: Skip writing when the payload matches the previous dump for
+            the same changedAfter window and that file still exists. Off by
+            default: every call writes a new file.
         config: ``MPathConfig`` overriding paths/URLs/output directory.
 
     Returns:
@@ -217,27 +347,36 @@ def get_clients(
         changed_after_utc = None
         suffix = "all"
 
-    for attempt in range(1, max_retries + 1):
-        token = make_jwt(user_code=user_code, config=config)
-        params = {"userCode": user_code, "JWT": token}
-        if include_changed_after and changed_after_utc:
-            params["changedAfterUTC"] = changed_after_utc
+    body = _fetch_clients_with_retry(user_code, changed_after_utc, max_retries, show_url, config)
+    rows = _stamp_and_dump(body, "clients", out_dir, suffix,
+                           pretty=pretty, skip_unchanged=skip_unchanged)
+    return rows, out_dir
 
-        body = _call_raw("getClients", show_url=show_url, config=config, **params)
-        status = body.get("status")
 
-        if status == 1:
-            rows = _stamp_and_dump(body, "clients", out_dir, suffix)
-            return rows, out_dir
+def get_clients_batch(
+    user_code: str,
+    windows: List[str],
+    *,
+    max_workers: int = 4,
+    config: MPathConfig = GLOBAL_CONFIG,
+) -> Dict[str, List[Dict]]:
+    """Fetch clients for several changedAfter windows concurrently.
 
-        if status == -1:
-            if attempt < max_retries:
-                print(f"API returned status –1 (attempt {attempt}/{max_retries}); retrying in 5 seconds.")
-                time.sleep(5)
-                continue
-            raise RuntimeError("API gave status –1 after max retries.")
+    Each window is handled by ``get_clients`` on a thread pool; the threads share
+    the pooled HTTP session and the cached JWT.
 
-        raise RuntimeError(f"Unexpected API status: {status}\n{json.dumps(body, indent=2)}")
+    Args:
+        user_code: 5-character m-Path user code.
+        windows: changedAfterUTC values ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS').
+        max_workers: Maximum number of requests in flight.
+        config: ``MPathConfig`` overriding paths/URLs/output directory.
+
+    Returns:
+        Mapping of each window (as given) to its list of client records.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        results = ex.map(lambda w: get_clients(user_code, w, config=config)[0], windows)
+        return dict(zip(windows, results))
 
 
 # ─────────────────────────────────────────────── 5 | USER CODE RESOLUTION (CLI-ONLY)
@@ -271,7 +410,9 @@ def resolve_user_code(cli_uc: Optional[str], auto_yes: bool = False) -> str:
 
 # ─────────────────────────────────────────────── 6 | CLI
 
-def _cli() -> None:
+@lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the CLI parser once; repeated ``_cli`` calls (tests, dispatchers) reuse it."""
     parser = argparse.ArgumentParser(
         description="Download client metadata from m-Path and save JSON (no CSV flattening)."
     )
@@ -287,14 +428,21 @@ def _cli() -> None:
                         help="Skip confirmation prompts (use env/default silently).")
     parser.add_argument("--show-url", action="store_true",
                         help="Print the fully-expanded request URL before it is sent (JWT redacted).")
+    parser.add_argument("--pretty", action="store_true",
+                        help="Indent the saved JSON (default: compact).")
+    parser.add_argument("--skip-unchanged", action="store_true",
+                        help="Write nothing if the payload equals the previous dump for this window.")
 
     # Overrides for paths/URL/output directory
     parser.add_argument("--privkey", type=Path, help="Path to private key PEM.")
     parser.add_argument("--pubkey",  type=Path, help="Path to public  key PEM.")
     parser.add_argument("--base-url", type=str,  help="Base API URL (e.g. https://m-path.io/API2).")
     parser.add_argument("--outdir",   type=Path, help="Directory to dump raw JSON files.")
+    return parser
+
 
-    args = parser.parse_args()
+def _cli(argv: Optional[List[str]] = None) -> None:
+    args = _build_parser().parse_args(argv)
 
     user_code = resolve_user_code(args.user_code, auto_yes=args.yes)
 
@@ -314,6 +462,8 @@ def _cli() -> None:
         max_retries=args.max_retries,
         show_url=args.show_url,
         include_changed_after=not args.all,
+        pretty=args.pretty,
+        skip_unchanged=args.skip_unchanged,
         config=cfg,
     )
 
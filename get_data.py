@@ -25,10 +25,19 @@
 # SOFTWARE.
 
 from __future__ import annotations
+from contextlib import nullcontext
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
-import json, os, requests, jwt, time
+from datetime import datetime, timezone
+import gzip, json, os, requests, time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+import _auth, _frames, _http
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
 
 # ─────────────────────────────────────────────── 0 | SETTINGS
 # Define key file paths and base output directory
@@ -39,20 +48,28 @@ DEFAULT_BASE_DUMP_DIR = Path("mpath_raw").expanduser()
 def make_jwt(user_code, ttl_minutes: int = 5, private_key_path: Path = DEFAULT_PRIVATE_KEY_PEM) -> str:
     """
     Generate a signed JWT for user authentication.
+
+    Key parsing and token reuse are shared with the other scripts (see _auth.py),
+    so retries do not re-read the key or re-sign.
     
     Args:
         user_code (str): 5-character m-Path user code.
         ttl_minutes (int): Token expiration in minutes.
+        private_key_path (Path): Path to PEM private key.
 
     Returns:
         str: Encoded JWT string.
     """
-    private_key = DEFAULT_PRIVATE_KEY_PEM.read_text()
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes)
-    payload = {"exp": int(exp.timestamp()), "userCode": user_code}
-    return jwt.encode(payload, private_key, algorithm="RS256")
+    return _auth.make_jwt(user_code, private_key_path, ttl_minutes)
 
 # ─────────────────────────────────────────────── 3 | API HELPERS
+# status –1 in the JSON body is handled by get_data
+_SESSION = _http.SESSION
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (e.g. to mount custom adapters)."""
+    return _SESSION
+
 def _call_raw(endpoint: str, **params) -> dict:
     """
     Perform GET request to the specified m-Path API endpoint.
@@ -65,11 +82,12 @@ def _call_raw(endpoint: str, **params) -> dict:
         dict: Parsed JSON response.
     """
     BASE_URL = "https://m-path.io/API2"
-    resp = requests.get(f"{BASE_URL}/{endpoint}", params=params, timeout=30)
+    resp = _SESSION.get(f"{BASE_URL}/{endpoint}", params=params, timeout=30)
     resp.raise_for_status()
-    return resp.json()
+    return _http.parse_json(resp)
 
-def _stamp_and_dump(body: dict, key: str, connection_id: int, conn_dir: Path) -> list[dict]:
+def _stamp_and_dump(body: dict, key: str, connection_id: int, conn_dir: Path,
+                    compress: bool = False) -> list[dict]:
     """
     Append download timestamp and save raw JSON payload.
 
@@ -78,6 +96,7 @@ def _stamp_and_dump(body: dict, key: str, connection_id: int, conn_dir: Path) ->
         key (str): Key to extract from the response.
         connection_id (int): Target connection ID.
         conn_dir (Path): Output directory.
+        compress (bool): Write a gzip-compressed ``.json.gz`` snapshot.
 
     Returns:
         list[dict]: List of data rows.
@@ -86,8 +105,14 @@ def _stamp_and_dump(body: dict, key: str, connection_id: int, conn_dir: Path) ->
     iso_now = utc_now.strftime("%Y%m%dT%H%M%SZ")
     for row in body.get(key, []):
         row["downloadedAt"] = iso_now
-    out_json = conn_dir / f"{key}_{connection_id}_{iso_now}.json"
-    out_json.write_text(json.dumps(body, indent=2, ensure_ascii=False))
+    out_json = conn_dir / f"{key}_{connection_id}_{iso_now}.json{'.gz' if compress else ''}"
+    with open(out_json, "wb", buffering=1 << 20) as raw, \
+         (gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) if compress else nullcontext(raw)) as f:
+        if orjson is not None:
+            f.write(orjson.dumps(body, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(body):
+                f.write(chunk.encode("utf-8"))
     print(f"✓ Raw payload saved → {out_json}")
     return body[key]
 
@@ -95,7 +120,8 @@ def get_data(user_code=None,
              connection_id=None,
              max_retries: int = 3,
              base_dump_dir: Path = DEFAULT_BASE_DUMP_DIR,
-             private_key_path: Path = DEFAULT_PRIVATE_KEY_PEM) -> tuple[list[dict], Path]:
+             private_key_path: Path = DEFAULT_PRIVATE_KEY_PEM,
+             compress_raw: bool = False) -> tuple[list[dict], Path]:
     """
     Fetch raw data from m-Path API with retry logic.
 
@@ -105,6 +131,7 @@ def get_data(user_code=None,
         max_retries (int): Number of retry attempts on failure.
         base_dump_dir (Path): Base directory for output files.
         private_key_path (Path): Path to PEM private key.
+        compress_raw (bool): Save the raw payload gzip-compressed (``.json.gz``).
 
     Returns:
         tuple: (List of raw data rows, output directory path)
@@ -118,76 +145,122 @@ def get_data(user_code=None,
 
         status = body.get("status")
         if status == 1:
-            return _stamp_and_dump(body, "data", connection_id, conn_dir), conn_dir
+            return _stamp_and_dump(body, "data", connection_id, conn_dir, compress_raw), conn_dir
 
         if status == -1:
             if attempt < max_retries:
-                print(f"API returned status –1 (attempt {attempt}/{max_retries}); retrying in 5 seconds.")
-                time.sleep(5)
+                delay = _http.status_backoff(attempt)
+                print(f"API returned status –1 (attempt {attempt}/{max_retries}); retrying in {delay:.1f} seconds.")
+                time.sleep(delay)
                 continue
             raise RuntimeError("API gave status –1 after max retries.")
-        raise RuntimeError(f"Unexpected API status: {status}\n{json.dumps(body, 2)}")
+        raise RuntimeError(f"Unexpected API status: {status}\n{json.dumps(body, indent=2, ensure_ascii=False)}")
+
+def get_data_many(connection_ids: list[int], *,
+                  user_code=None,
+                  max_workers: int = 8,
+                  **kwargs) -> dict[int, tuple[list[dict], Path]]:
+    """
+    Fetch raw data for several connections concurrently.
+
+    Each connection is handled by ``get_data`` on a thread pool; the threads
+    share the pooled HTTP session.
+
+    Args:
+        connection_ids (list): Connection IDs to retrieve data for.
+        user_code (str): m-Path user code.
+        max_workers (int): Maximum number of requests in flight.
+        **kwargs: Passed through to ``get_data`` (max_retries, base_dump_dir, ...).
+
+    Returns:
+        dict: Each connection ID (in input order) → (raw data rows, output directory).
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        results = ex.map(lambda c: get_data(user_code=user_code, connection_id=c, **kwargs),
+                         connection_ids)
+        return dict(zip(connection_ids, results))
 
 
 # ─────────────────────────────────────────────── 4 | FLATTEN UTILITIES
-def _to_scalar(val):
+_EMPTY: dict = {}   # shared read-only default for missing basicQuestion blocks
+
+# Reuses one encoder; the cell text matches json.dumps ("[1, 2]") with or without orjson.
+def _to_scalar(val, _containers=(list, dict), _dumps=json.JSONEncoder(ensure_ascii=False).encode):
     """Convert list or dict to JSON string, leave scalars unchanged."""
-    return json.dumps(val, ensure_ascii=False) if isinstance(val, (list, dict)) else val
+    return _dumps(val) if type(val) in _containers else val
 
-def _flatten_answer(ans: dict, rec: dict, prefix: str):
+def _flatten_answer(ans: dict, put, prefix: str):
     """
-    Flatten a single answer block into a flat dictionary format.
+    Flatten a single answer block, storing each field via ``put(column, value)``.
     
-    Recursively handles nested containerAnswer structures.
+    Nested containerAnswer structures are walked with an explicit stack
+    (depth-first, children in order) rather than by recursion.
     """
-    for k, v in ans.items():
-        if k in ("basicQuestion", "cAnswer"):
-            continue
-        rec[f"{prefix}{k}"] = _to_scalar(v)
+    to_scalar = _to_scalar                  # local lookup in the hot loop
+    stack = [(ans, prefix)]
+    while stack:
+        ans, prefix = stack.pop()
+        for k, v in ans.items():
+            if k in ("basicQuestion", "cAnswer"):
+                continue
+            put(f"{prefix}{k}", to_scalar(v))
 
-    bq = ans.get("basicQuestion", {})
-    for subk, subv in bq.items():
-        rec[f"{prefix}basicQuestion_{subk}"] = _to_scalar(subv)
+        bq = ans.get("basicQuestion") or _EMPTY
+        for subk, subv in bq.items():
+            put(f"{prefix}basicQuestion_{subk}", to_scalar(subv))
 
-    for valkey in ("iAnswer", "dAnswer", "sAnswer"):
-        if valkey in ans and ans[valkey]:
-            rec[f"{prefix}value"] = ans[valkey][0]
-            break
+        for valkey in ("iAnswer", "dAnswer", "sAnswer"):
+            val = ans.get(valkey)
+            if val:
+                put(f"{prefix}value", val[0])
+                break
 
-    if ans.get("typeAnswer") == "containerAnswer":
-        for child in ans.get("cAnswer", []):
-            child_sq = child.get("basicQuestion", {}).get("shortQuestion", "container")
-            _flatten_answer(child, rec, f"{prefix}{child_sq}_")
+        if ans.get("typeAnswer") == "containerAnswer":
+            for child in reversed(ans.get("cAnswer", [])):
+                child_sq = (child.get("basicQuestion") or _EMPTY).get("shortQuestion", "container")
+                stack.append((child, f"{prefix}{child_sq}_"))
 
 def flatten_rows(raw_rows: list[dict]) -> pd.DataFrame:
     """
     Convert list of raw m-Path rows to a flat tabular DataFrame.
 
+    Values are written straight into one full-length list per column (None
+    where a row lacks the field), so pandas gets ready-made columns instead
+    of a list of per-row dicts.
+
     Args:
         raw_rows (list): Raw JSON response entries.
 
     Returns:
         pd.DataFrame: Flattened DataFrame.
     """
-    flattened = []
-    for entry in raw_rows:
-        row: dict = {}
-
+    n_rows = len(raw_rows)
+    cols: dict[str, list] = {}
+    i = 0
+
+    def put(key: str, val):
+        col = cols.get(key)
+        if col is None:
+            col = cols[key] = [None] * n_rows
+        col[i] = val
+
+    to_scalar = _to_scalar
+    for i, entry in enumerate(raw_rows):
         for k, v in entry.items():
             if k != "data":
-                row[k] = _to_scalar(v)
+                put(k, to_scalar(v))
 
         inner = entry["data"]
         for k, v in inner.items():
             if k != "answers":
-                row[f"data_{k}"] = _to_scalar(v)
+                put(f"data_{k}", to_scalar(v))
 
         for ans in inner.get("answers", []):
-            sq = ans.get("basicQuestion", {}).get("shortQuestion", "Q")
-            _flatten_answer(ans, row, f"{sq}_")
+            sq = (ans.get("basicQuestion") or _EMPTY).get("shortQuestion", "Q")
+            _flatten_answer(ans, put, f"{sq}_")
+
+    return pd.DataFrame(cols)
 
-        flattened.append(row)
-    return pd.DataFrame(flattened)
 
 def flatten_and_save(raw_rows: list[dict], connection_id: int,
                      conn_dir: Path, tz: str = "US/Eastern"
@@ -206,18 +279,13 @@ def flatten_and_save(raw_rows: list[dict], connection_id: int,
     """
     df = flatten_rows(raw_rows)
 
-    ts_cols = [c for c in df.columns
-               if ("timeStamp" in c) and df[c].dtype != "object"]
-    if ts_cols:
-        df[ts_cols] = (
-            pd.to_datetime(df[ts_cols].stack(), unit="ms", utc=True)
-              .dt.tz_convert(tz)
-              .dt.strftime("%Y-%m-%d %H:%M:%S")
-              .unstack()
-        )
+    # dtypes read once – no per-column Series lookups
+    ts_cols = [c for c, dt in df.dtypes.items()
+               if ("timeStamp" in c) and not pd.api.types.is_string_dtype(dt)]
+    _frames.localize_ms(df, ts_cols, tz)
 
     iso_now = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     csv_path = conn_dir / f"data_clean_{connection_id}_{iso_now}_{len(df)}rows.csv"
-    df.to_csv(csv_path, index=False)
+    _frames.to_csv(df, csv_path)
     print(f"✓ Clean CSV saved → {csv_path}")
     return df, csv_path
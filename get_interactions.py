@@ -40,11 +40,20 @@ API:  import get_interactions as mp
 """
 
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
-import argparse, json, os, re, sys, time, requests, jwt
+from datetime import datetime, timezone
+import argparse, gzip, json, os, re, sys, time, requests
 import pandas as pd
 
+import _auth, _frames, _http
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
+
 # ───────────────────────────────────────────── 0 | PATHS & CONSTANTS
 BASE_URL = "https://m-path.io/API2"
 DEFAULT_PRIVKEY_PATH = Path.home() / ".mpath_private_key.pem"
@@ -53,15 +62,23 @@ DEFAULT_BASE_OUT = Path("interactions_raw").expanduser()
 # ───────────────────────────────────────────── 1 | LOW-LEVEL HELPERS
 def _make_jwt(user_code: str, ttl_min: int = 5, privkey_path: Path = DEFAULT_PRIVKEY_PATH) -> str:
     """Generate a short-lived signed JWT token."""
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl_min)
-    payload = {"exp": int(exp.timestamp()), "userCode": user_code}
-    return jwt.encode(payload, privkey_path.read_text(), algorithm="RS256")
+    return _auth.make_jwt(user_code, privkey_path, ttl_min)
 
-def _to_scalar(v):
+# Nested cells keep json.dumps' text ("[1, 2]", non-ASCII as is) whether or not
+# orjson is installed; the encoder is built once instead of on every call.
+# Exact type() match: parsed JSON only holds plain list/dict.
+def _to_scalar(v, _containers=(list, dict), _dumps=json.JSONEncoder(ensure_ascii=False).encode):
     """Convert lists and dicts to JSON strings for CSV compatibility."""
-    return json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+    return _dumps(v) if type(v) in _containers else v
 
 # ───────────────────────────────────────────── 2 | API REQUEST
+# status –1 in the JSON body is handled below
+_SESSION = _http.SESSION
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (e.g. to mount custom adapters)."""
+    return _SESSION
+
 def _fetch_interactions(user_code: str, connection_id: int, retries: int = 3,
                         privkey_path: Path = DEFAULT_PRIVKEY_PATH) -> list[dict]:
     """Fetch interaction data from the API with retry on status –1."""
@@ -71,94 +88,149 @@ def _fetch_interactions(user_code: str, connection_id: int, retries: int = 3,
             "connectionId": connection_id,
             "JWT": _make_jwt(user_code, privkey_path=privkey_path)
         }
-        body = requests.get(f"{BASE_URL}/getInteractions", params=params, timeout=30).json()
+        resp = _SESSION.get(f"{BASE_URL}/getInteractions", params=params, timeout=30)
+        resp.raise_for_status()
+        body = _http.parse_json(resp)
 
         status = body.get("status")
         if status == 1:
             return body.get("interactions", [])
         if status == -1 and attempt < retries:
-            print(f"status –1; retrying … [{attempt}/{retries}]")
-            time.sleep(5)
+            delay = _http.status_backoff(attempt)
+            print(f"status –1; retrying in {delay:.1f} s … [{attempt}/{retries}]")
+            time.sleep(delay)
             continue
-        raise RuntimeError(f"API error:\n{json.dumps(body, 2)}")
+        raise RuntimeError(f"API error:\n{json.dumps(body, indent=2, ensure_ascii=False)}")
 
 # ───────────────────────────────────────────── 3 | FLATTEN TREE
-def _walk(item: dict, path: list[str], rows: list[dict]):
-    """Recursively walk tree structure and flatten questions."""
-    cur_path = path + [item.get("shortQuestion") or item.get("itemId", "")]
-    if item.get("typeQuestion") == "container":
-        for child in item.get("items", []):
-            _walk(child, cur_path, rows)
-        return
-
-    rec = {"path": "/".join(p for p in cur_path if p)}
-    for k, v in item.items():
-        if k == "items":
-            continue
-        if isinstance(v, dict):
-            for subk, subv in v.items():
-                rec[f"{k}.{subk}"] = _to_scalar(subv)
+def _count_leaves(root: dict) -> int:
+    """Count the leaf questions under ``root`` (pre-pass used to pre-size columns)."""
+    n = 0
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if item.get("typeQuestion") == "container":
+            stack.extend(item.get("items", []))
         else:
-            rec[k] = _to_scalar(v)
-    rows.append(rec)
+            n += 1
+    return n
 
 def _questions_df(root: dict) -> pd.DataFrame:
-    """Convert a single root container into a flattened DataFrame."""
-    rows: list[dict] = []
-    _walk(root, [], rows)
-    return pd.DataFrame(rows)
+    """
+    Convert a single root container into a flattened DataFrame.
+
+    The tree is walked with an explicit stack (depth-first, in document order)
+    and every leaf question becomes one row. Each column is allocated once at
+    full length (leaves are counted up front) and filled by row index, so
+    pandas receives ready-made columns with None where a question lacks a field.
+    """
+    n_rows = _count_leaves(root)
+    cols: dict[str, list] = {}
+
+    def column(key: str) -> list:
+        col = cols.get(key)
+        if col is None:
+            col = cols[key] = [None] * n_rows
+        return col
+
+    to_scalar = _to_scalar                  # local lookup in the hot loop
+    row = 0
+    stack = [(root, ())]
+    while stack:
+        item, path = stack.pop()
+        path = (*path, item.get("shortQuestion") or item.get("itemId", ""))
+        if item.get("typeQuestion") == "container":
+            stack.extend((child, path) for child in reversed(item.get("items", [])))
+            continue
+
+        column("path")[row] = "/".join(p for p in path if p)
+        for k, v in item.items():
+            if k == "items":
+                continue
+            if isinstance(v, dict):
+                for subk, subv in v.items():
+                    column(f"{k}.{subk}")[row] = to_scalar(subv)
+            else:
+                column(k)[row] = to_scalar(v)
+        row += 1
+
+    return pd.DataFrame(cols)
 
 # ───────────────────────────────────────────── 4 | SAVE OUTPUTS
+_SLUG_RE = re.compile(r"[^\w\-]+")
+
 def _slug(text: str, maxlen: int = 48) -> str:
     """Sanitize title into a valid filename slug."""
-    return re.sub(r"[^\w\-]+", "_", text.strip())[:maxlen] or "root"
+    return _SLUG_RE.sub("_", text.strip())[:maxlen] or "root"
 
-def _stamp_and_dump(raw_obj, stem: str, out_dir: Path) -> str:
-    """Save raw JSON with timestamped filename."""
+def _stamp_and_dump(raw_obj, stem: str, out_dir: Path, compress: bool = False) -> str:
+    """Save raw JSON with timestamped filename (``.json.gz`` when ``compress``)."""
     ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    fp = out_dir / f"{stem}_{ts}.json"
-    fp.write_text(json.dumps(raw_obj, indent=2, ensure_ascii=False))
+    fp = out_dir / f"{stem}_{ts}.json{'.gz' if compress else ''}"
+    with fp.open("wb", buffering=1024 * 1024) as raw, \
+         (gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) if compress else nullcontext(raw)) as f:
+        if orjson is not None:
+            f.write(orjson.dumps(raw_obj, option=orjson.OPT_INDENT_2))
+        else:
+            for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(raw_obj):
+                f.write(chunk.encode("utf-8"))
     print(f"✓ Raw JSON saved → {fp}")
     return ts
 
+def _process_root(idx: int, root: dict, out_dir: Path, ts: str,
+                  tz: str) -> tuple[str, pd.DataFrame]:
+    """Flatten one root container, localize its timestamps and write its CSV."""
+    title = root.get("fullQuestion") or root.get("shortQuestion") or root.get("itemId") or f"root{idx}"
+    df = _questions_df(root)
+
+    # name match is vectorized; the dtype check then runs on the few matches only.
+    # Text columns (object, or "str" on pandas 3) are already formatted – skip them.
+    dtypes = df.dtypes
+    named_ts = dtypes[dtypes.index.astype(str).str.contains("timeStamp", regex=False)]
+    ts_cols = [c for c, dt in named_ts.items() if not pd.api.types.is_string_dtype(dt)]
+    _frames.localize_ms(df, ts_cols, tz)
+
+    fn = f"{idx:02d}_{_slug(title)}_{ts}_{len(df)}rows.csv"
+    fp = out_dir / fn
+    _frames.to_csv(df, fp)
+    print(f"  └─ root {idx}: {len(df)} questions → {fp}")
+    return title, df
+
 def _flatten_and_save_roots(roots: list[dict], connection_id: int, out_dir: Path,
-                            tz: str = "US/Eastern") -> dict[str, pd.DataFrame]:
+                            tz: str = "US/Eastern",
+                            compress_raw: bool = False) -> dict[str, pd.DataFrame]:
     """
     Flatten each root container and save CSV per root.
 
+    Roots are processed on a small thread pool so one root's flattening
+    overlaps another's CSV write; results are collected in root order.
+
     Args:
         roots: List of root interaction containers.
         connection_id: m-Path connection ID.
         out_dir: Target output directory.
         tz: Timezone for timestamp conversion.
+        compress_raw: Save the raw JSON gzip-compressed (``.json.gz``).
 
     Returns:
         dict: Mapping of root title to corresponding DataFrame.
     """
-    ts = _stamp_and_dump(roots, f"interactions_{connection_id}", out_dir)
+    ts = _stamp_and_dump(roots, f"interactions_{connection_id}", out_dir, compress_raw)
     dfs: dict[str, pd.DataFrame] = {}
 
     if not roots:
         print("No interactions returned.")
         return dfs
 
-    for idx, root in enumerate(roots, 1):
-        title = root.get("fullQuestion") or root.get("shortQuestion") or root.get("itemId") or f"root{idx}"
-        df = _questions_df(root)
-
-        ts_cols = [c for c in df.columns if ("timeStamp" in c) and df[c].dtype != "object"]
-        if ts_cols:
-            df[ts_cols] = (
-                pd.to_datetime(df[ts_cols].stack(), unit="ms", utc=True)
-                  .dt.tz_convert(tz)
-                  .dt.strftime("%Y-%m-%d %H:%M:%S")
-                  .unstack()
-            )
-
-        fn = f"{idx:02d}_{_slug(title)}_{ts}_{len(df)}rows.csv"
-        fp = out_dir / fn
-        df.to_csv(fp, index=False)
-        print(f"  └─ root {idx}: {len(df)} questions → {fp}")
+    if len(roots) == 1:
+        results = [_process_root(1, roots[0], out_dir, ts, tz)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(8, len(roots))) as pool:
+            futures = [pool.submit(_process_root, idx, root, out_dir, ts, tz)
+                       for idx, root in enumerate(roots, 1)]
+            results = [f.result() for f in futures]
+
+    for title, df in results:
         dfs[title] = df
 
     return dfs
@@ -169,7 +241,8 @@ def get_interactions(*,
                      user_code: str | None = None,
                      retries: int = 3,
                      out_base: Path | str = DEFAULT_BASE_OUT,
-                     private_key_path: Path = DEFAULT_PRIVKEY_PATH
+                     private_key_path: Path = DEFAULT_PRIVKEY_PATH,
+                     compress_raw: bool = False
                     ) -> dict[str, pd.DataFrame]:
     """
     Retrieve and save interaction data for a single connection.
@@ -180,6 +253,7 @@ def get_interactions(*,
         retries: Retry count on API status –1.
         out_base: Output directory.
         privkey_path: Path to RSA private key.
+        compress_raw: Save the raw JSON gzip-compressed (``.json.gz``).
 
     Returns:
         Dictionary mapping root container titles to DataFrames.
@@ -203,7 +277,31 @@ def get_interactions(*,
 
     print(f"Fetching interactions for connection {connection_id} …")
     roots = _fetch_interactions(user_code, connection_id, retries=retries, privkey_path=private_key_path)
-    return _flatten_and_save_roots(roots, connection_id, out_dir)
+    return _flatten_and_save_roots(roots, connection_id, out_dir, compress_raw=compress_raw)
+
+def get_interactions_many(connection_ids: list[int], *,
+                          user_code: str | None = None,
+                          max_workers: int = 8,
+                          **kwargs) -> dict[int, dict[str, pd.DataFrame]]:
+    """
+    Retrieve and save interaction data for several connections concurrently.
+
+    Each connection is handled by ``get_interactions`` on a thread pool; the
+    threads share the pooled HTTP session.
+
+    Parameters:
+        connection_ids: Participant connection IDs.
+        user_code: Practitioner code (5-character); falls back to $MPATH_USERCODE.
+        max_workers: Maximum number of requests in flight.
+        **kwargs: Passed through to ``get_interactions`` (retries, out_base, ...).
+
+    Returns:
+        Mapping of each connection ID (in input order) to its root DataFrames.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        results = ex.map(lambda c: get_interactions(connection_id=c, user_code=user_code, **kwargs),
+                         connection_ids)
+        return dict(zip(connection_ids, results))
 
 # ───────────────────────────────────────────── 6 | CLI HANDLER
 if __name__ == "__main__":
@@ -41,11 +41,19 @@ API:  import get_schedule as mp
 
 from __future__ import annotations
 
+from contextlib import nullcontext
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
-import argparse, json, os, re, sys, time, requests, jwt
+from datetime import datetime, timezone
+import argparse, gzip, json, os, re, sys, time, requests
 import pandas as pd
 
+import _auth, _frames, _http
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
+
 # ───────────────────────────────────────────── 0 | PATHS & CONSTANTS
 BASE_URL = "https://m-path.io/API2"
 DEFAULT_PRIVKEY_PATH = Path.home() / ".mpath_private_key.pem"
@@ -53,27 +61,42 @@ DEFAULT_BASE_OUT = Path("schedule_raw").expanduser()
 
 # ───────────────────────────────────────────── 1 | LOW-LEVEL HELPERS
 def _make_jwt(user_code: str, ttl_min: int = 5, privkey_path: Path = DEFAULT_PRIVKEY_PATH) -> str:
-    """Generate a short-lived signed JWT token for m-Path API."""
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl_min)
-    payload = {"exp": int(exp.timestamp()), "userCode": user_code}
-    return jwt.encode(payload, privkey_path.read_text(), algorithm="RS256")
+    """Generate a short-lived signed JWT token."""
+    return _auth.make_jwt(user_code, privkey_path, ttl_min)
 
-def _to_scalar(v):
+# One prebuilt stdlib encoder, so CSV cells read "[1, 2]" regardless of orjson.
+def _to_scalar(v, _containers=(list, dict), _dumps=json.JSONEncoder(ensure_ascii=False).encode):
     """Convert list or dict to JSON string for CSV compatibility."""
-    return json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+    return _dumps(v) if type(v) in _containers else v
 
 def _flatten(obj: dict, parent_key: str = "", sep: str = ".") -> dict:
-    """Flatten nested dictionaries using dot notation."""
+    """Flatten nested dictionaries using dot notation (composite keys are interned)."""
     out = {}
-    for k, v in obj.items():
-        key = f"{parent_key}{sep}{k}" if parent_key else k
-        if isinstance(v, dict):
-            out.update(_flatten(v, key, sep=sep))
+    to_scalar, intern = _to_scalar, sys.intern      # local lookups in the hot loop
+    # one stack of (prefix, items-iterator) instead of recursion; suspending the
+    # parent's iterator keeps keys in the same depth-first order as before
+    stack = [(parent_key, iter(obj.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for k, v in items:
+            # interned so every row dict shares one str object per column name
+            key = intern(f"{prefix}{sep}{k}") if prefix else k
+            if isinstance(v, dict):
+                stack.append((key, iter(v.items())))
+                break
+            out[key] = to_scalar(v)
         else:
-            out[key] = _to_scalar(v)
+            stack.pop()
     return out
 
 # ───────────────────────────────────────────── 2 | API FETCH
+# status –1 in the JSON body is handled below
+_SESSION = _http.SESSION
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (e.g. to mount custom adapters)."""
+    return _SESSION
+
 def _fetch_schedule(user_code: str, connection_id: int, retries: int = 3,
                     private_key_path: Path = DEFAULT_PRIVKEY_PATH) -> list[dict]:
     """Fetch schedule entries from m-Path API, retry on status -1."""
@@ -83,31 +106,39 @@ def _fetch_schedule(user_code: str, connection_id: int, retries: int = 3,
             "connectionId": connection_id,
             "JWT": _make_jwt(user_code, privkey_path=private_key_path)
         }
-        body = requests.get(f"{BASE_URL}/getSchedule", params=params, timeout=30).json()
+        resp = _SESSION.get(f"{BASE_URL}/getSchedule", params=params, timeout=30)
+        resp.raise_for_status()
+        body = _http.parse_json(resp)
 
         status = body.get("status")
         if status == 1:
             return body.get("schedule", [])
         if status == -1 and attempt < retries:
-            print(f"status –1; retrying … [{attempt}/{retries}]")
-            time.sleep(5)
+            delay = _http.status_backoff(attempt)
+            print(f"status –1; retrying in {delay:.1f} s … [{attempt}/{retries}]")
+            time.sleep(delay)
             continue
-        raise RuntimeError(f"API error:\n{json.dumps(body, 2)}")
+        raise RuntimeError(f"API error:\n{json.dumps(body, indent=2, ensure_ascii=False)}")
 
 
 # ───────────────────────────────────────────── 3 | SAVE / CONVERT
-_TS_FMT = "%Y-%m-%d %H:%M:%S"
-
-def _stamp_and_dump(raw_obj, stem: str, out_dir: Path) -> str:
-    """Save raw JSON with a timestamped filename."""
+def _stamp_and_dump(raw_obj, stem: str, out_dir: Path, compress: bool = False) -> str:
+    """Save raw JSON with a timestamped filename (``.json.gz`` when ``compress``)."""
     ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    fp = out_dir / f"{stem}_{ts}.json"
-    fp.write_text(json.dumps(raw_obj, indent=2, ensure_ascii=False))
+    fp = out_dir / f"{stem}_{ts}.json{'.gz' if compress else ''}"
+    with fp.open("wb", buffering=1024 * 1024) as raw, \
+         (gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) if compress else nullcontext(raw)) as f:
+        if orjson is not None:
+            f.write(orjson.dumps(raw_obj, option=orjson.OPT_INDENT_2))
+        else:
+            for chunk in json.JSONEncoder(indent=2, ensure_ascii=False).iterencode(raw_obj):
+                f.write(chunk.encode("utf-8"))
     print(f"✓ Raw JSON saved → {fp}")
     return ts
 
+
 def _save_schedule(entries: list[dict], connection_id: int, out_dir: Path,
-                   tz: str = "US/Eastern") -> pd.DataFrame:
+                   tz: str = "US/Eastern", compress_raw: bool = False) -> pd.DataFrame:
     """
     Flatten schedule entries and save as CSV.
 
@@ -116,11 +147,12 @@ def _save_schedule(entries: list[dict], connection_id: int, out_dir: Path,
         connection_id: Participant's connection ID.
         out_dir: Directory to save the output files.
         tz: Timezone for timestamp conversion.
+        compress_raw: Write the raw JSON snapshot gzip-compressed (``.json.gz``).
 
     Returns:
         Flattened pandas DataFrame of the schedule.
     """
-    ts = _stamp_and_dump(entries, f"schedule_{connection_id}", out_dir)
+    ts = _stamp_and_dump(entries, f"schedule_{connection_id}", out_dir, compress_raw)
 
     if not entries:
         print("Empty schedule.")
@@ -129,19 +161,14 @@ def _save_schedule(entries: list[dict], connection_id: int, out_dir: Path,
     df = pd.DataFrame([_flatten(e) for e in entries])
 
     # Convert timestamp fields to local time
-    ts_cols = [c for c in df.columns
+    # dtypes read once – no per-column Series lookups
+    ts_cols = [c for c, dt in df.dtypes.items()
                if ("timeStamp" in c or "timeStart" in c or "timeEnd" in c)
-               and df[c].dtype != "object"]
-    if ts_cols:
-        df[ts_cols] = (
-            pd.to_datetime(df[ts_cols].stack(), unit="ms", utc=True)
-              .dt.tz_convert(tz)
-              .dt.strftime(_TS_FMT)
-              .unstack()
-        )
+               and not pd.api.types.is_string_dtype(dt)]
+    _frames.localize_ms(df, ts_cols, tz)
 
     fp = out_dir / f"schedule_{connection_id}_{ts}_{len(df)}rows.csv"
-    df.to_csv(fp, index=False)
+    _frames.to_csv(df, fp)
     print(f"✓ CSV saved → {fp}")
     return df
 
@@ -150,7 +177,8 @@ def get_schedule(*, connection_id: int | None = None,
                  user_code: str | None = None,
                  retries: int = 3,
                  out_base: Path | str = DEFAULT_BASE_OUT,
-                 private_key_path: Path = DEFAULT_PRIVKEY_PATH
+                 private_key_path: Path = DEFAULT_PRIVKEY_PATH,
+                 compress_raw: bool = False
                 ) -> pd.DataFrame:
     """
     Fetch and save schedule data for a single m-Path connection.
@@ -161,6 +189,7 @@ def get_schedule(*, connection_id: int | None = None,
         retries: Number of retry attempts for status –1.
         out_base: Output directory.
         privkey_path: Path to RSA private key.
+        compress_raw: Save the raw JSON gzip-compressed (``.json.gz``).
 
     Returns:
         Flattened pandas DataFrame with one row per schedule entry.
@@ -184,7 +213,7 @@ def get_schedule(*, connection_id: int | None = None,
 
     print(f"Fetching schedule for connection {connection_id} …")
     entries = _fetch_schedule(user_code, connection_id, retries=retries, private_key_path=private_key_path)
-    return _save_schedule(entries, connection_id, out_dir)
+    return _save_schedule(entries, connection_id, out_dir, compress_raw=compress_raw)
 
 
 # ───────────────────────────────────────────── 5 | CLI HANDLER
@@ -43,14 +43,17 @@ Example usage (notebook):
 
 from __future__ import annotations
 
-import json, math, os, time, jwt, requests
-from datetime import datetime, timedelta, timezone
-from itertools import count
+import gzip, os, time, requests
 from pathlib import Path
 from typing import Sequence
+from urllib.parse import quote_plus
+
+import _auth, _http, _jsonlib
 
 # ───────────────────────────────────────────── 0 | CONFIGURATION
 BASE_URL = "https://m-path.io/API2"
+_URL_GET_SCHEDULE = f"{BASE_URL}/getSchedule"
+_URL_SET_SCHEDULE = f"{BASE_URL}/setSchedule"
 DEFAULT_USER_CODE = os.getenv("MPATH_USERCODE")
 DEFAULT_private_key_path = Path(os.getenv("MPATH_PRIVKEY", Path.home() / ".mpath_private_key.pem"))
 
@@ -58,29 +61,51 @@ DEFAULT_private_key_path = Path(os.getenv("MPATH_PRIVKEY", Path.home() / ".mpath
 # ───────────────────────────────────────────── 1 | JWT GENERATOR
 def _jwt(user_code: str, private_key_path: Path, ttl_min: int = 5) -> str:
     """Generate a short-lived JWT for authenticated API calls."""
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl_min)
-    payload = {"exp": int(exp.timestamp()), "userCode": user_code}
-    return jwt.encode(payload, private_key_path.read_text(), algorithm="RS256")
+    return _auth.make_jwt(user_code, private_key_path, ttl_min)
 
 # ───────────────────────────────────────────── 2 | API CALLS
+# status –1 on setSchedule is retried by the loop in _push_schedule
+_SESSION = _http.SESSION
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (e.g. to mount custom adapters)."""
+    return _SESSION
+
 def _fetch_schedule(connection_id: int, user_code: str, private_key_path: Path) -> list[dict]:
     """Fetch the existing schedule for a given connection."""
     params = {"userCode": user_code, "connectionId": connection_id, "JWT": _jwt(user_code, private_key_path)}
-    body = requests.get(f"{BASE_URL}/getSchedule", params=params, timeout=30).json()
+    resp = _SESSION.get(_URL_GET_SCHEDULE, params=params, timeout=30)
+    resp.raise_for_status()  # a 5xx left over after urllib3's retries is not JSON
+    body = _http.parse_json(resp)
     if body.get("status") != 1:
         raise RuntimeError(f"getSchedule failed: {body}")
     return body["schedule"]
 
 def _push_schedule(connection_id: int, entries: list[dict],
-                   user_code: str, private_key_path: Path, retries=3) -> dict:
-    """Push the updated schedule (merged) to m-Path."""
+                   user_code: str, private_key_path: Path, retries=3,
+                   compress: bool = False) -> dict:
+    """
+    Push the updated schedule (merged) to m-Path.
+
+    With ``compress=True`` the form body is gzip-compressed; a 400/415 answer
+    switches back to the plain form body for this and later attempts.
+    """
     params = {"userCode": user_code, "connectionId": connection_id, "JWT": _jwt(user_code, private_key_path)}
-    data = {"scheduleJSON": json.dumps(entries, ensure_ascii=False)}
+    raw = _jsonlib.dumps_bytes(entries)
+    form = b"scheduleJSON=" + quote_plus(raw).encode("ascii")  # == urlencode() of the field
+    plain = {"Content-Type": "application/x-www-form-urlencoded"}
+    data, headers = form, plain
+    if compress:
+        data = gzip.compress(form, compresslevel=6)
+        headers = {**plain, "Content-Encoding": "gzip"}
 
     for attempt in range(1, retries + 1):
-        r = requests.post(f"{BASE_URL}/setSchedule", params=params, data=data, timeout=30)
+        r = _SESSION.post(_URL_SET_SCHEDULE, params=params, data=data, headers=headers, timeout=30)
+        if data is not form and r.status_code in (400, 415):
+            data, headers = form, plain
+            r = _SESSION.post(_URL_SET_SCHEDULE, params=params, data=data, headers=headers, timeout=30)
         r.raise_for_status()
-        reply = r.json()
+        reply = _http.parse_json(r)
         if reply.get("status") != -1:
             if reply.get("status") != 1:
                 raise RuntimeError(f"setSchedule rejected: {reply}")
@@ -90,12 +115,12 @@ def _push_schedule(connection_id: int, entries: list[dict],
         time.sleep(2 * attempt)
 
 # ───────────────────────────────────────────── 3 | ENTRY CONSTRUCTION
-_WHITELIST = {
+_WHITELIST = frozenset({
     "startTime", "endTime", "scheduledTime",
     "itemId", "beepId", "localId",
     "expirationInterval", "reminderIntervals",
     "randomizationScheme"
-}
+})
 
 def build_entries(
     *,
@@ -125,57 +150,50 @@ def build_entries(
     if len(starts) != len(ends):
         raise ValueError("starts and ends length mismatch")
 
+    if expiration_interval is None and not all(ends):
+        raise ValueError("Need endTime or expiration_interval.")
+
+    n = len(starts)
     labels = list(labels or [])
-    gen = count(1)
-    while len(labels) < len(starts):
-        labels.append(f"auto_{next(gen)}")
+    if len(labels) < n:
+        labels += [f"auto_{i}" for i in range(1, n - len(labels) + 1)]
 
-    new: list[dict] = []
-    for st, et, lid in zip(starts, ends, labels):
-        e = {
+    return [
+        {
             "startTime": st,
             "scheduledTime": st,
             "itemId": item_id,
             "beepId": 0,
             "localId": lid,
             "randomizationScheme": randomization_scheme,
+            **({"endTime": et} if et else {"expirationInterval": expiration_interval}),
+            **({"reminderIntervals": list(reminder_intervals)} if reminder_intervals else {}),
         }
-        if et:
-            e["endTime"] = et
-        elif expiration_interval is not None:
-            e["expirationInterval"] = expiration_interval
-        else:
-            raise ValueError("Need endTime or expiration_interval.")
-
-        if reminder_intervals:
-            e["reminderIntervals"] = list(reminder_intervals)
-
-        new.append(e)
-    return new
+        for st, et, lid in zip(starts, ends, labels)
+    ]
 
 # ───────────────────────────────────────────── 4 | CLEAN EXISTING ROWS
+def _maybe_json(v):
+    """Decode list-like JSON strings (e.g. "[5, 10]"); return anything else unchanged."""
+    if isinstance(v, str) and len(v) >= 2 and v[0] == "[" and v[-1] == "]":
+        try:
+            return _jsonlib.loads(v)
+        except ValueError:
+            return v
+    return v
+
 def _clean(rec: dict) -> dict:
-    """Remove extraneous keys and normalize values."""
-    out = {}
-    for k, v in rec.items():
-        if k not in _WHITELIST:
-            continue
-        if isinstance(v, float) and math.isnan(v):
-            continue
-        if isinstance(v, str) and v.startswith('[') and v.endswith(']'):
-            try:
-                v = json.loads(v)
-            except Exception:
-                pass
-        out[k] = v
-    return out
+    """Remove extraneous keys and NaN values, decoding JSON list strings (key order kept)."""
+    return {k: _maybe_json(v) for k, v in rec.items()
+            if k in _WHITELIST and not (isinstance(v, float) and v != v)}
 
 # ───────────────────────────────────────────── 5 | MERGE AND PUSH
 def merge_and_push(*,
                    connection_id: int,
                    new_entries: list[dict],
                    user_code: str = DEFAULT_USER_CODE,
-                   private_key_path: Path = DEFAULT_private_key_path) -> dict:
+                   private_key_path: Path = DEFAULT_private_key_path,
+                   compress: bool = False) -> dict:
     """
     Merge new entries with current schedule and push result.
 
@@ -184,6 +202,7 @@ def merge_and_push(*,
         new_entries: List of entries created by build_entries.
         user_code: 5-char practitioner code.
         private_key_path: Path to PEM private key file.
+        compress: Gzip the setSchedule request body (falls back if refused).
 
     Returns:
         API response from setSchedule.
@@ -194,12 +213,13 @@ def merge_and_push(*,
         raise FileNotFoundError(f"RSA private key not found: {private_key_path}")
 
     current = [_clean(r) for r in _fetch_schedule(connection_id, user_code, private_key_path)]
-    return _push_schedule(connection_id, current + new_entries, user_code, private_key_path)
+    return _push_schedule(connection_id, current + new_entries, user_code, private_key_path,
+                          compress=compress)
 
 
 # ───────────────────────────────────────────── 6 | CLI DEMO (OPTIONAL)
 if __name__ == "__main__":
-    import argparse, json
+    import argparse
     cli = argparse.ArgumentParser(description="Demo: add beeps without loss.")
     cli.add_argument("--connection", type=int, required=True)
     cli.add_argument("--item", required=True, help="itemId")
@@ -212,4 +232,4 @@ if __name__ == "__main__":
         labels=["jul25_demo"],
     )
     res = merge_and_push(connection_id=args.connection, new_entries=demo)
-    print(json.dumps(res, indent=2))
+    print(_jsonlib.dumps_indent(res))
@@ -2,9 +2,15 @@
 from __future__ import annotations
 from collections import OrderedDict, abc as _abc
 from datetime import datetime as _dt
-import ast, json, time, pathlib
+import ast, json, re, time, pathlib
+import numpy as np
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib encoder is used otherwise
+    orjson = None
+
 # Public API -------------------------------------------------------------------
 __all__ = [
     "combine_entries",
@@ -29,9 +35,31 @@ def _fmt_time(v):
         return v.strftime("%Y-%m-%d %H:%M:%S")
     return str(v).replace("T", " ").split("+")[0]
 
+def _fmt_time_col(col: pd.Series) -> pd.Series:
+    """Column-wise _fmt_time: same strings, missing cells become None."""
+    if pd.api.types.is_datetime64_any_dtype(col):
+        # wall-clock values → numpy ISO strings; much cheaper than .dt.strftime
+        wall = col.dt.tz_localize(None) if col.dt.tz is not None else col
+        iso = np.datetime_as_string(wall.to_numpy(dtype="datetime64[s]"), unit="s")
+        out = pd.Series(np.char.replace(iso, "T", " "), index=col.index)
+    elif pd.api.types.infer_dtype(col, skipna=True) == "string":
+        out = col.str.replace("T", " ", regex=False).str.split("+").str[0]
+    else:                                   # mixed objects – per cell
+        out = col.map(_fmt_time)
+    return out.astype(object).where(col.notna(), None)
+
+# non-negative int literals only (no leading zeros), so the result always equals literal_eval's
+_INT_LIST_RE = re.compile(r"\[\s*(?:0|[1-9]\d*)(?:\s*,\s*(?:0|[1-9]\d*))*\s*\]", re.ASCII)
+
 def _fix_reminders(v):
     """Return list[int] or None."""
-    if v is None or (isinstance(v, (list, tuple)) and len(v) == 0) or pd.isna(v):
+    if isinstance(v, str):
+        s = v.strip()
+        if _INT_LIST_RE.fullmatch(s):           # common "[5, 10]" – no parser needed
+            return list(map(int, s[1:-1].split(",")))
+    elif isinstance(v, (list, tuple)):          # before pd.isna, which is element-wise on lists
+        return list(v) or None
+    if v is None or pd.isna(v):
         return None
     if isinstance(v, str):
         try:
@@ -44,10 +72,12 @@ def _fix_reminders(v):
         return list(v)
     return None
 
-def _to_api_dict(src: dict | pd.Series, idx: int, is_new: bool) -> OrderedDict:
+def _to_api_dict(src: dict, idx: int, is_new: bool,
+                 order: list[str] = ORDER,
+                 time_keys: set[str] = TIME_KEYS) -> OrderedDict:
     """Build an OrderedDict in the desired key order for the m-Path API."""
     od = OrderedDict()
-    for k in ORDER:
+    for k in order:
         if k == "beepId":
             # set to 0 for new rows, or keep old (here we always set 0 per your original code)
             od[k] = 0
@@ -57,8 +87,12 @@ def _to_api_dict(src: dict | pd.Series, idx: int, is_new: bool) -> OrderedDict:
             ri = _fix_reminders(src.get(k))
             if ri:
                 od[k] = ri
-        elif k in src and pd.notna(src[k]):
-            od[k] = _fmt_time(src[k]) if k in TIME_KEYS else src[k]
+        elif k in src:
+            v = src[k]
+            # inline missing check (None / NaN / NaT / pd.NA) – cheaper than pd.notna per cell
+            if v is not None and v is not pd.NA and v == v:
+                # future rows arrive pre-formatted from combine_entries
+                od[k] = _fmt_time(v) if is_new and k in time_keys else v
     return od
 
 # Main functions ---------------------------------------------------------------
@@ -70,18 +104,21 @@ def combine_entries(df_future: pd.DataFrame,
     Combine existing future entries (DataFrame rows) and newly built entries (dicts)
     into a single list of OrderedDicts ready for m-Path JSON upload.
     """
-    global ORDER, TIME_KEYS
-    ORDER = order
-    TIME_KEYS = time_keys
+    # format the time columns in one pass on a shallow copy (caller's frame untouched)
+    df_future = df_future.copy(deep=False)
+    for k in set(time_keys).intersection(df_future.columns):
+        df_future[k] = _fmt_time_col(df_future[k])
 
+    # plain dicts instead of iterrows(): no per-row Series boxing / dtype upcasting
+    records = df_future.to_dict(orient="records")
     future_entries = [
-        _to_api_dict(row, i, is_new=False)
-        for i, (_, row) in enumerate(df_future.iterrows())
+        _to_api_dict(row, i, False, order, time_keys)
+        for i, row in enumerate(records)
     ]
     offset = len(future_entries)
 
     new_entries = [
-        _to_api_dict(e, i + offset, is_new=True)
+        _to_api_dict(e, i + offset, True, order, time_keys)
         for i, e in enumerate(new_beeps)
     ]
 
@@ -96,5 +133,8 @@ def save_upload_json(combined: list[OrderedDict],
     """
     ts = time.strftime("%Y%m%dT%H%M%S")
     json_path = pathlib.Path(f"{filename_prefix}{ts}.json").resolve()
-    json_path.write_text(json.dumps(combined, ensure_ascii=False, indent=2))
+    if orjson is not None:
+        json_path.write_bytes(orjson.dumps(combined, option=orjson.OPT_INDENT_2))
+    else:
+        json_path.write_text(json.dumps(combined, ensure_ascii=False, indent=2), encoding="utf-8")
     return json_path
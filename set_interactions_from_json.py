@@ -24,59 +24,151 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import requests, json, jwt, os, sys
-from datetime import datetime, timedelta, timezone
+import requests, os, sys, gzip
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+from urllib.parse import quote_plus
+
+import _auth, _http, _jsonlib
 
 # ─────────────────────────────────────────────── 0 | CREDENTIAL SETUP
+# Credentials are resolved on first use, not at import, so importing the module
+# never reads the environment, stats the key file or prompts.
 BASE_URL = "https://m-path.io/API2"
-USER_CODE = os.getenv("MPATH_USERCODE")
-if not USER_CODE:
-    sys.exit("MPATH_USERCODE is not set (see generate_keys.py).")
+_URL_SET_INTERACTIONS = f"{BASE_URL}/setInteractions"
+DEFAULT_PRIVKEY_PATH = Path.home() / ".mpath_private_key.pem"
+
+def _resolve_user_code(user_code: Optional[str] = None) -> str:
+    """Return ``user_code`` or $MPATH_USERCODE."""
+    user_code = user_code or os.getenv("MPATH_USERCODE")
+    if not user_code:
+        raise ValueError("MPATH_USERCODE is not set (see generate_keys.py) and user_code parameter missing.")
+    return user_code
 
-if os.getenv("MPATH_CONNECTION_ID", "").isdigit():
-    CONNECTION_ID = int(os.environ["MPATH_CONNECTION_ID"])
-else:
-    CONNECTION_ID = int(input("Enter numeric CONNECTION ID: ").strip())
+def _resolve_key_path(private_key_path: Optional[os.PathLike] = None) -> Path:
+    """Return ``private_key_path``, $MPATH_PRIVKEY or ~/.mpath_private_key.pem."""
+    return Path(private_key_path or os.getenv("MPATH_PRIVKEY") or DEFAULT_PRIVKEY_PATH)
 
-KEY_PRIV = Path(os.getenv("MPATH_PRIVKEY", Path.home() / ".mpath_private_key.pem"))
-if not KEY_PRIV.exists():
-    sys.exit(f"RSA private key not found: {KEY_PRIV}")
+@lru_cache(maxsize=1)
+def _default_connection_id() -> int:
+    """Connection ID from $MPATH_CONNECTION_ID, else asked for once per process."""
+    env_id = os.getenv("MPATH_CONNECTION_ID", "")
+    if env_id.isdigit():
+        return int(env_id)
+    return int(input("Enter numeric CONNECTION ID: ").strip())
 
 # ─────────────────────────────────────────────── 1 | JWT GENERATOR
-def make_jwt(ttl=5) -> str:
-    """Generate a short-lived (ttl minutes) JWT for secure API access."""
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl)
-    return jwt.encode({"exp": exp, "userCode": USER_CODE},
-                      KEY_PRIV.read_text(), algorithm="RS256")
+def make_jwt(ttl=5, *, user_code: Optional[str] = None,
+             private_key_path: Optional[os.PathLike] = None) -> str:
+    """Generate a short-lived (ttl minutes) JWT."""
+    return _auth.make_jwt(_resolve_user_code(user_code), _resolve_key_path(private_key_path), ttl)
 
 # ─────────────────────────────────────────────── 2 | INTERACTION UPLOADER
-def set_interactions(interactions: list[dict]) -> None:
+_SESSION = _http.SESSION
+
+def get_session() -> requests.Session:
+    """Return the module's shared keep-alive session (e.g. to mount custom adapters)."""
+    return _SESSION
+
+# Upload mode the server last accepted: "body" (form field) or "query" (legacy)
+_PREFERRED_ENCODING: Optional[str] = None
+_QUERY_LIMIT = 1_000_000  # bytes; larger payloads would only earn a 414 as a query string
+
+def set_interactions(interactions: list[dict], *, connection_id: Optional[int] = None,
+                     user_code: Optional[str] = None,
+                     private_key_path: Optional[os.PathLike] = None,
+                     compress: bool = False, verbose: bool = True) -> Optional[dict]:
     """
     Upload a replacement interaction (questionnaire) list to m-Path.
-    Sends the full JSON as a query string parameter (not as body).
+    Targets ``connection_id`` (default: $MPATH_CONNECTION_ID, else asked for
+    once) as ``user_code`` (default: $MPATH_USERCODE), signing with
+    ``private_key_path`` (default: $MPATH_PRIVKEY or ~/.mpath_private_key.pem),
+    and returns the parsed server reply (None if it was not JSON).
+    Sends the full JSON as the ``interactionsJSON`` form field of the POST body
+    (gzip-compressed when ``compress=True``); only the auth parameters stay in
+    the query string. If the server answers 400/415, or replies with a status
+    other than 1, the upload is repeated the legacy way, with the JSON as a
+    query string parameter, provided the JSON is at most ``_QUERY_LIMIT`` bytes
+    (otherwise a note says the fallback was skipped). The way that earned
+    status 1 is remembered and tried first on later uploads.
+    The server reply is pretty-printed only when ``verbose`` and stdout is a
+    terminal; otherwise a one-line status is printed (or nothing).
     """
-    payload = json.dumps(interactions, ensure_ascii=False)
+    global _PREFERRED_ENCODING
+    # keep the JSON as bytes; it is only decoded if the query-string mode is used
+    raw = _jsonlib.dumps_bytes(interactions)
+    user_code = _resolve_user_code(user_code)
     params = {
-        "userCode": USER_CODE,
-        "connectionId": CONNECTION_ID,
-        "JWT": make_jwt(),
-        "interactionsJSON": payload,
+        "userCode": user_code,
+        "connectionId": _default_connection_id() if connection_id is None else connection_id,
+        "JWT": make_jwt(user_code=user_code, private_key_path=private_key_path),
     }
 
-    resp = requests.post(f"{BASE_URL}/setInteractions", params=params, timeout=30)
-    resp.raise_for_status()
+    data = b"interactionsJSON=" + quote_plus(raw).encode("ascii")  # == urlencode(), minus a str copy
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    if compress:
+        data = gzip.compress(data, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
 
-    try:
-        body = resp.json()
-    except ValueError:
-        print("Raw response (non-JSON):\n", resp.text)
-        return
+    def send(mode: str) -> requests.Response:
+        if mode == "query":
+            return _SESSION.post(_URL_SET_INTERACTIONS, timeout=30,
+                                 params={**params, "interactionsJSON": raw.decode("utf-8")})
+        return _SESSION.post(_URL_SET_INTERACTIONS, params=params, data=data, headers=headers, timeout=30)
 
-    print("Server reply:\n", json.dumps(body, indent=2, ensure_ascii=False))
+    # try the mode that worked last time first; huge payloads can't go in a URL at all
+    fits_query = len(raw) <= _QUERY_LIMIT
+    skipped = (f"Query-string fallback skipped: payload is {len(raw):,} bytes "
+               f"(limit {_QUERY_LIMIT:,}).")
+    modes = ["body", "query"] if fits_query else ["body"]
+    if _PREFERRED_ENCODING in modes:
+        modes.sort(key=lambda m: m != _PREFERRED_ENCODING)
+    for i, mode in enumerate(modes):
+        last = i == len(modes) - 1
+        resp = send(mode)
+        if resp.status_code in (400, 415) and not last:
+            continue
+        if resp.status_code in (400, 415) and not fits_query:
+            print(skipped)
+        resp.raise_for_status()
+        try:
+            body = _http.parse_json(resp)
+        except ValueError:
+            print("Raw response (non-JSON):\n", resp.text)
+            return None
+        if body.get("status") == 1:
+            _PREFERRED_ENCODING = mode  # only a mode the server accepted is pinned
+            break
+        # a 200 with an error status may mean the server ignored this encoding
+        if not last:
+            continue
+
+    if verbose and sys.stdout.isatty():
+        print("Server reply:\n", _jsonlib.dumps_indent(body))
+    elif verbose:  # redirected/batch output: skip serializing a possibly large reply
+        print(f"Server reply: status {body.get('status')}")
 
     if body.get("status") != 1:
+        if not fits_query:
+            print(skipped)
         raise RuntimeError("API rejected the payload.")
+    return body
+
+def set_interactions_many(items: list[tuple[int, list[dict]]], *, max_workers: int = 8,
+                          **kwargs) -> list[Optional[dict]]:
+    """
+    Upload interaction lists to several connections concurrently.
+    ``items`` holds (connection_id, interactions) pairs; each upload runs
+    ``set_interactions`` on a thread pool sharing the pooled session and the
+    cached JWT. Extra keyword arguments (user_code, private_key_path, compress,
+    verbose) are passed through.
+    Returns the server replies in input order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(lambda item: set_interactions(item[1], connection_id=item[0], **kwargs),
+                           items))
 
 # ─────────────────────────────────────────────── 3 | CLI TEST
 if __name__ == "__main__":
@@ -89,6 +181,9 @@ if __name__ == "__main__":
     if not json_file.is_file():
         raise FileNotFoundError(f"{json_file} does not exist.")
 
-    interactions = json.loads(json_file.read_text(encoding="utf-8"))
+    raw = json_file.read_bytes()  # parse the bytes directly – no decoded str copy
+    if json_file.suffix == ".gz":  # compressed snapshot from get_interactions(compress_raw=True)
+        raw = gzip.decompress(raw)
+    interactions = _jsonlib.loads(raw)
     print(f"Uploading {len(interactions)} interaction block(s)…")
     set_interactions(interactions)
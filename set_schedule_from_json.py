@@ -26,36 +26,57 @@
 
 from __future__ import annotations
 
-import json, os, sys, time, jwt, requests, argparse
+import gzip, json, os, sys, time, requests, argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta, timezone
 from typing import Iterable, List, Any
+from urllib.parse import quote_plus
+
+import _auth, _http, _jsonlib
 
 BASE_URL = "https://m-path.io/API2"
+_URL_SET_SCHEDULE = f"{BASE_URL}/setSchedule"
 
 # ─────────────────────────────────────────────── 0 | ALLOWED SCHEDULE KEYS
-_KEEP_KEYS = {
+_KEEP_KEYS = frozenset({
     "startTime", "endTime", "scheduledTime",
     "itemId", "beepId", "localId",
     "randomizationScheme", "reminderIntervals",
     "expirationInterval", "useAsButton", "singleUse",
     "required", "passed", "scheduleType",
-}
+})
 
 def _minimalize(entries: Iterable[dict]) -> List[dict]:
     """Strip unknown keys so the payload matches the /setSchedule schema."""
-    return [{k: v for k, v in e.items() if k in _KEEP_KEYS} for e in entries]
+    # already-clean entries (subset check runs in C) are passed through uncopied;
+    # the rebuild keeps the entry's own key order
+    return [e if e.keys() <= _KEEP_KEYS else {k: v for k, v in e.items() if k in _KEEP_KEYS}
+            for e in entries]
+
+def _dedupe(entries: Iterable[dict]) -> List[dict]:
+    """Drop exact duplicate entries (same keys and values, any key order at any depth); first one wins."""
+    seen, out = set(), []
+    for e in entries:
+        key = json.dumps(e, sort_keys=True, separators=(",", ":"))  # canonical form; values may be nested
+        if key not in seen:
+            seen.add(key)
+            out.append(e)
+    return out
+
 
 # ─────────────────────────────────────────────── 1 | JWT HELPER
 def _jwt(user_code: str, privkey: Path, ttl_min: int = 5) -> str:
-    exp = datetime.now(timezone.utc) + timedelta(minutes=ttl_min)
-    return jwt.encode(
-        {"exp": int(exp.timestamp()), "userCode": user_code},
-        privkey.read_text(),
-        algorithm="RS256",
-    )
+    """Sign a short-lived JWT."""
+    return _auth.make_jwt(user_code, privkey, ttl_min)
 
 # ─────────────────────────────────────────────── 2 | CORE FUNCTION
+# Only the JSON status –1, which urllib3 cannot see, is retried by the loop in set_schedule.
+_SESSION = _http.SESSION
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session (e.g. to mount custom adapters)."""
+    return _SESSION
+
 def set_schedule(
     entries: List[dict],
     user_code: str,
@@ -63,30 +84,52 @@ def set_schedule(
     private_key_path: str | os.PathLike,
     *,
     minimal: bool = False,
+    dedupe: bool = False,
     retries: int = 3,
+    compress: bool = False,
 ) -> dict:
     """
     Upload the schedule to m-Path via the /setSchedule endpoint.
+
+    With ``dedupe=True`` exact duplicate entries (e.g. from concatenated
+    schedule lists) are dropped before upload, after ``minimal`` stripping.
+
+    With ``compress=True`` the form body is gzip-compressed; a 400/415 answer
+    switches back to the plain form body for this and later attempts.
     """
     if minimal:
         entries = _minimalize(entries)
+    if dedupe:
+        entries = _dedupe(entries)
 
     privkey = Path(private_key_path).expanduser().resolve()
     if not privkey.is_file():
         raise FileNotFoundError(f"RSA private key not found: {privkey}")
 
-    params = dict(
-        userCode     = user_code,
-        connectionId = connection_id,
-        JWT          = _jwt(user_code, privkey),
-        scheduleJSON = json.dumps(entries, ensure_ascii=False),
-    )
+    params = {
+        "userCode":     user_code,
+        "connectionId": connection_id,
+        "JWT":          _jwt(user_code, privkey),
+    }
+    # scheduleJSON travels as a form body (as in merge_and_push_schedule), not in the URL
+    raw = _jsonlib.dumps_bytes(entries)
+    form = b"scheduleJSON=" + quote_plus(raw).encode("ascii")  # == urlencode() of the field
+    plain = {"Content-Type": "application/x-www-form-urlencoded"}
+    data, headers = form, plain
+    if compress:
+        data = gzip.compress(form, compresslevel=6)
+        headers = {**plain, "Content-Encoding": "gzip"}
 
     for attempt in range(1, retries + 1):
-        r = requests.post(f"{BASE_URL}/setSchedule", params=params, timeout=30)
+        r = _SESSION.post(_URL_SET_SCHEDULE, params=params, data=data,
+                          headers=headers, timeout=30)
+        if data is not form and r.status_code in (400, 415):
+            data, headers = form, plain
+            r = _SESSION.post(_URL_SET_SCHEDULE, params=params, data=data,
+                              headers=headers, timeout=30)
         r.raise_for_status()
         try:
-            body = r.json()
+            body = _jsonlib.loads(r.content)   # every _jsonlib backend raises ValueError
         except ValueError:
             raise RuntimeError("Server returned non-JSON:\n" + r.text)
 
@@ -97,6 +140,27 @@ def set_schedule(
         print(f"Retrying due to status –1 [{attempt}/{retries}] …")
         time.sleep(2 * attempt)
 
+def set_schedule_many(
+    items: List[tuple[int, List[dict]]],
+    user_code: str,
+    private_key_path: str | os.PathLike,
+    *,
+    max_workers: int = 8,
+    **kwargs: Any,
+) -> List[dict]:
+    """
+    Upload schedules to several connections concurrently.
+
+    ``items`` holds (connection_id, entries) pairs; each upload runs
+    ``set_schedule`` on a thread pool sharing the pooled session and the
+    cached JWT. Extra keyword arguments (minimal, retries, compress) are
+    passed through. Returns the server replies in input order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(
+            lambda item: set_schedule(item[1], user_code, item[0], private_key_path, **kwargs),
+            items))
+
 # ─────────────────────────────────────────────── 3 | CLI ENTRY POINT
 def _cli() -> None:
     ap = argparse.ArgumentParser(description="Upload a schedule JSON to m-Path.")
@@ -106,8 +170,12 @@ def _cli() -> None:
     ap.add_argument("--privkey",        help="Path to RSA private key PEM")
     ap.add_argument("--minimal",        action="store_true",
                     help="Strip unknown keys before upload")
+    ap.add_argument("--dedupe",         action="store_true",
+                    help="Drop exact duplicate entries before upload")
     ap.add_argument("--retries", type=int, default=3,
                     help="Number of retries on status –1 (default: 3)")
+    ap.add_argument("--gzip",           action="store_true",
+                    help="Gzip the request body (falls back if the server refuses)")
     args = ap.parse_args()
 
     # Credentials
@@ -126,7 +194,7 @@ def _cli() -> None:
     # Load JSON file
     jpath = Path(args.json_file).expanduser().resolve()
     try:
-        entries = json.loads(jpath.read_text("utf-8"))
+        entries = _jsonlib.loads(jpath.read_bytes())
     except Exception as e:
         sys.exit(f"Failed to read/parse JSON: {e}")
 
@@ -135,11 +203,15 @@ def _cli() -> None:
 
     print(f"Uploading {len(entries)} entr{'y' if len(entries)==1 else 'ies'} …")
     reply = set_schedule(entries, user_code, conn_id, privkey,
-                         minimal=args.minimal, retries=args.retries)
-    print(json.dumps(reply, indent=2, ensure_ascii=False))
-    if "new2id" in reply:
-        print("\nMapping localId to new beepId:")
-        print(json.dumps(reply["new2id"], indent=2))
+                         minimal=args.minimal, dedupe=args.dedupe,
+                         retries=args.retries, compress=args.gzip)
+    if sys.stdout.isatty():
+        print(_jsonlib.dumps_indent(reply))
+        if "new2id" in reply:
+            print("\nMapping localId to new beepId:")
+            print(_jsonlib.dumps_indent(reply["new2id"]))
+    else:  # redirected/batch output: skip serializing a possibly large new2id map
+        print(f"Server reply: status {reply.get('status')}, {len(reply.get('new2id') or ())} new beepId(s)")
 
 if __name__ == "__main__":
     _cli()